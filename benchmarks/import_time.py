@@ -0,0 +1,70 @@
+"""Benchmark the startup cost of `sqlflat` using `python -X importtime`.
+
+Usage:
+    python benchmarks/import_time.py [--runs 10] [--top 10]
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+MODULES = ["sqlalchemy_flattener", "sqlalchemy_flattener.__main__"]
+
+
+def import_times(module: str) -> dict[str, int]:
+    """Return the cumulative import time in microseconds of every module imported."""
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def help_time() -> float:
+    """Return the wall clock time in milliseconds of `sqlflat --help`."""
+
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "sqlalchemy_flattener", "--help"],
+        capture_output=True,
+        check=True,
+    )
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    for module in MODULES:
+        runs = [import_times(module) for _ in range(args.runs)]
+        totals = [run[module] / 1000 for run in runs]
+        print(
+            f"{module}: median {statistics.median(totals):.1f}ms, "
+            f"min {min(totals):.1f}ms over {args.runs} runs"
+        )
+        slowest = sorted(runs[-1].items(), key=lambda item: item[1], reverse=True)
+        for name, cumulative in slowest[1 : args.top + 1]:
+            print(f"    {cumulative / 1000:8.1f}ms  {name}")
+
+    timings = [help_time() for _ in range(args.runs)]
+    print(f"sqlflat --help: median {statistics.median(timings):.1f}ms wall clock")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,17 @@
-from .flattener import SQLAlchemyFlattener
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .flattener import SQLAlchemyFlattener
 
 __all__ = ["SQLAlchemyFlattener"]
+
+
+def __getattr__(name: str) -> Any:
+    # defer importing sqlalchemy until the flattener is actually used
+    if name == "SQLAlchemyFlattener":
+        from .flattener import SQLAlchemyFlattener
+
+        return SQLAlchemyFlattener
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,11 +3,103 @@ import importlib
 import sys
 from collections.abc import Callable
 from pathlib import Path
+from typing import Any
 
-from sqlalchemy import Table
+# writers are resolved lazily, so only the requested format is ever imported
+WRITERS = {
+    "dict": "sqlalchemy_flattener.writers:write_as_dict",
+    "sql": "sqlalchemy_flattener.writers:write_as_sql",
+}
 
-from sqlalchemy_flattener.flattener import SQLAlchemyFlattener
-from sqlalchemy_flattener.writers import write_as_dict, write_as_sql
+# options that may be set at the top level of a manifest, or per output
+OUTPUT_OPTIONS = {"format", "deterministic", "compression"}
+OUTPUT_KEYS = {"instances", "order", "output"}
+COMPRESSIONS = ("gzip", "zstd")
+
+
+def load_writer(output_format: str) -> Callable[..., None]:
+    """Import the writer function registered for an output format."""
+
+    module_path, function_name = WRITERS[output_format].split(":")
+    return getattr(importlib.import_module(module_path), function_name)
+
+
+def load_object(path: str) -> Any:
+    """Import an object from a dotted module path, e.g. `foo.bar.instance_list`."""
+
+    module_path, name = path.rsplit(".", 1)
+    return getattr(importlib.import_module(module_path), name)
+
+
+def load_manifest(path: str, defaults: dict[str, Any]) -> list[dict[str, Any]]:
+    """Read the outputs listed in a TOML manifest.
+
+    Top level `format`, `deterministic` and `compression` keys override `defaults`, and each
+    `[[outputs]]` table must provide `instances`, `order` and `output`, optionally overriding
+    the same options.
+    """
+
+    if sys.version_info >= (3, 11):
+        import tomllib
+    else:
+        import tomli as tomllib
+
+    with open(path, "rb") as file:
+        manifest = tomllib.load(file)
+
+    if unknown := manifest.keys() - OUTPUT_OPTIONS - {"outputs"}:
+        raise ValueError(
+            f"Manifest {path} has unknown keys {', '.join(sorted(unknown))}"
+        )
+    defaults = {
+        **defaults,
+        **{k: v for k, v in manifest.items() if k in OUTPUT_OPTIONS},
+    }
+    jobs = []
+    for index, entry in enumerate(manifest.get("outputs", [])):
+        if missing := OUTPUT_KEYS - entry.keys():
+            raise ValueError(
+                f"Manifest output {index} is missing {', '.join(sorted(missing))}"
+            )
+        if unknown := entry.keys() - OUTPUT_KEYS - OUTPUT_OPTIONS:
+            raise ValueError(
+                f"Manifest output {index} has unknown keys {', '.join(sorted(unknown))}"
+            )
+        if entry.get("format", defaults["format"]) not in WRITERS:
+            raise ValueError(f"Manifest output {index} has an unknown format")
+        compression = entry.get("compression", defaults["compression"])
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError(f"Manifest output {index} has an unknown compression")
+        jobs.append({**defaults, **entry})
+    if not jobs:
+        raise ValueError(f"Manifest {path} does not list any outputs")
+    return jobs
+
+
+def write_output(job: dict[str, Any], unordered_data: Any, order: Any) -> None:
+    """Write flattened data in the table insert order and format of a job."""
+
+    from sqlalchemy import Table
+
+    from sqlalchemy_flattener.spill import SpillStore
+
+    ordered_mapping = {}
+    for obj in order:
+        attr = obj if isinstance(obj, Table) else obj.__table__
+        if data := unordered_data.get(attr):
+            ordered_mapping[attr] = data
+
+    writer = load_writer(job["format"])
+    try:
+        writer(
+            ordered_mapping,
+            job["output"],
+            deterministic=job["deterministic"],
+            compression=job["compression"],
+        )
+    finally:
+        if isinstance(unordered_data, SpillStore):
+            unordered_data.close()
 
 
 def main() -> None:
@@ -15,52 +107,115 @@ def main() -> None:
     parser.add_argument(
         "instances",
         type=str,
+        nargs="?",
         help="The module namespace containing the model instances, e.g. `foo.bar.instance_list`",
     )
     parser.add_argument(
         "order",
         type=str,
+        nargs="?",
         help="The module namespace containing a sequence of table insert ordering.",
     )
     parser.add_argument(
         "output",
         type=str,
+        nargs="?",
         help="The output file path to write the flattened data to.",
     )
     parser.add_argument(
         "--format",
         type=str,
         default="sql",
-        choices=["dict", "sql"],
+        choices=list(WRITERS),
         help="The format to write the data in.",
     )
+    parser.add_argument(
+        "--deterministic",
+        action="store_true",
+        help="Write tables in dependency order, sort rows by primary key and order columns as defined on each table.",
+    )
+    parser.add_argument(
+        "--compression",
+        type=str,
+        default=None,
+        choices=COMPRESSIONS,
+        help="Compress the output file.",
+    )
+    parser.add_argument(
+        "--spill-threshold",
+        type=int,
+        default=None,
+        help="Spill rows to temporary files once this many are held in memory.",
+    )
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        default=None,
+        help="A TOML file listing several instances, order and output sets to flatten in one run.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="The number of outputs to write concurrently with --manifest.",
+    )
 
     args = parser.parse_args()
+    positional = (args.instances, args.order, args.output)
+    if args.manifest is None and None in positional:
+        parser.error("instances, order and output are required without --manifest")
+    if args.manifest is not None and any(positional):
+        parser.error("instances, order and output cannot be combined with --manifest")
+    if args.jobs is not None and args.manifest is None:
+        parser.error("--jobs can only be used with --manifest")
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("--jobs must be at least 1")
 
-    sys.path.append(str(Path.cwd()))
-    instance_path, instance_var = args.instances.rsplit(".", 1)
-    module = importlib.import_module(instance_path)
-    instances = getattr(module, instance_var)
-    if isinstance(instances, Callable):
-        instances = instances()
+    # heavy imports are deferred until after argument parsing, keeping `--help` fast
+    from concurrent.futures import ThreadPoolExecutor
 
-    order_path, order_var = args.order.rsplit(".", 1)
-    module = importlib.import_module(order_path)
-    order = getattr(module, order_var)
+    from sqlalchemy_flattener.flattener import SQLAlchemyFlattener
 
-    flattener = SQLAlchemyFlattener()
-    unordered_data = flattener.flatten(instances)
+    defaults = {
+        "format": args.format,
+        "deterministic": args.deterministic,
+        "compression": args.compression,
+    }
+    if args.manifest is not None:
+        jobs = load_manifest(args.manifest, defaults)
+    else:
+        jobs = [
+            {
+                **defaults,
+                "instances": args.instances,
+                "order": args.order,
+                "output": args.output,
+            }
+        ]
 
-    ordered_mapping = {}
-    for obj in order:
-        attr = obj if isinstance(obj, Table) else obj.__table__
-        if data := unordered_data.get(attr):
-            ordered_mapping[attr] = data
+    if args.spill_threshold is not None and any(job["deterministic"] for job in jobs):
+        parser.error("deterministic output cannot be combined with --spill-threshold")
 
-    if args.format == "dict":
-        write_as_dict(ordered_mapping, args.output)
-    else:
-        write_as_sql(ordered_mapping, args.output)
+    sys.path.append(str(Path.cwd()))
+    # a memoizing flattener converts instances shared between outputs only once, but
+    # holds every row in memory, so it is skipped when spilling
+    flattener = SQLAlchemyFlattener(
+        spill_threshold=args.spill_threshold,
+        memoize=len(jobs) > 1 and args.spill_threshold is None,
+    )
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        futures = []
+        for job in jobs:
+            instances = load_object(job["instances"])
+            if isinstance(instances, Callable):
+                instances = instances()
+            order = load_object(job["order"])
+            # flattening stays on this thread, while earlier outputs are being written
+            data = flattener.flatten(instances)
+            futures.append(executor.submit(write_output, job, data, order))
+        flattener.clear_conversions()
+        for future in futures:
+            future.result()
 
 
 if __name__ == "__main__":
@@ -1,19 +1,21 @@
 from __future__ import annotations
 
 from collections.abc import Sequence
-from datetime import date
-from enum import Enum
 from typing import TYPE_CHECKING, Any, Literal
-from uuid import UUID
 
-from sqlalchemy import Enum as SQLEnum
-from sqlalchemy import inspect
-from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy import Table, inspect, select, tuple_
 from sqlalchemy.orm import KeyFuncDict, MappedSQLExpression
+from sqlalchemy.schema import sort_tables
+
+from .serializers import default_registry
+from .spill import SpillStore
 
 if TYPE_CHECKING:
-    from sqlalchemy import Table
-    from sqlalchemy.orm import DeclarativeBase, Relationship
+    from sqlalchemy import Column, Connection, Select
+    from sqlalchemy.orm import DeclarativeBase, Mapper, Relationship
+    from sqlalchemy.types import TypeEngine
+
+    from .serializers import ColumnSerializer, SerializerRegistry
 
 __all__ = ["SQLAlchemyFlattener"]
 
@@ -26,6 +28,10 @@ class SQLAlchemyFlattener:
         serialize_uuids: bool = True,
         serialize_dates: bool = True,
         use_enum_values: bool = True,
+        spill_threshold: int | None = None,
+        spill_directory: str | None = None,
+        memoize: bool = False,
+        serializers: SerializerRegistry | None = None,
     ) -> None:
         """Initialize a flattener instance.
 
@@ -35,35 +41,75 @@ class SQLAlchemyFlattener:
             serialize_uuids: Whether to serialize UUIDs to strings.
             serialize_dates: Whether to serialize dates to strings.
             use_enum_values: Whether to use enum values instead of enum names.
+            spill_threshold: The number of rows to hold in memory before spilling them to
+                temporary files, or `None` to keep all rows in memory.
+            spill_directory: The directory to create temporary spill files in.
+            memoize: Whether to cache converted rows per instance, so instances shared
+                between `flatten` calls are only converted once. The cache keeps every
+                converted instance alive until `clear_conversions` is called, so it can't
+                be combined with a `spill_threshold`.
+            serializers: The registry used to convert column values. Defaults to a registry
+                configured by `serialize_uuids`, `serialize_dates` and `use_enum_values`.
         """
+        if memoize and spill_threshold is not None:
+            raise ValueError("memoize cannot be combined with a spill_threshold")
+
         self.id_attribute_name = id_attribute_name
         self.id_attribute_type = id_attribute_type
         self.serialize_uuids = serialize_uuids
         self.serialize_dates = serialize_dates
         self.use_enum_values = use_enum_values
+        self.spill_threshold = spill_threshold
+        self.spill_directory = spill_directory
+        self.memoize = memoize
+        # keyed by `id()`, holding a reference to the instance so the key stays unique
+        self._conversions: dict[int, tuple[DeclarativeBase, dict[str, Any]]] = {}
+        self.serializers = (
+            default_registry(serialize_uuids, serialize_dates, use_enum_values)
+            if serializers is None
+            else serializers
+        )
+        self._column_serializers: dict[
+            Mapper[Any], list[tuple[str, str, ColumnSerializer]]
+        ] = {}
+        self._secondary_column_map: dict[
+            Relationship[Any], list[tuple[str, bool, str, ColumnSerializer]]
+        ] = {}
 
     def flatten(
         self,
         data: DeclarativeBase | Sequence[DeclarativeBase],
-    ) -> dict[Table, list[dict[str, Any]]]:
-        """Flatten SQLAlchemy models to dictionaries ready for bulk insertion."""
+    ) -> dict[Table, list[dict[str, Any]]] | SpillStore:
+        """Flatten SQLAlchemy models to dictionaries ready for bulk insertion.
+
+        When a `spill_threshold` is set, the rows are returned in a `SpillStore`, which should
+        be closed once the data has been written.
+        """
 
         if not isinstance(data, Sequence):
             data = [data]
 
-        data_map = {}
+        data_map: dict[Table, list[dict[str, Any]]] | SpillStore = (
+            {}
+            if self.spill_threshold is None
+            else SpillStore(self.spill_threshold, self.spill_directory)
+        )
         for model in data:
             data_map = self.flatten_instance(model, data_map)
 
         return data_map
 
     def flatten_instance(
-        self, instance: DeclarativeBase, data_map: dict[Table, list[dict[str, Any]]]
-    ) -> dict[Table, list[dict[str, Any]]]:
+        self,
+        instance: DeclarativeBase,
+        data_map: dict[Table, list[dict[str, Any]]] | SpillStore,
+    ) -> dict[Table, list[dict[str, Any]]] | SpillStore:
         """Flatten SQLAlchemy models to dictionaries ready for bulk insertion."""
 
         inspector = inspect(instance)
-        self._append_mapping(data_map, instance.__table__, self.convert(instance))
+        self._append_mapping(data_map, instance.__table__, self._convert(instance))
+        if isinstance(data_map, SpillStore):
+            data_map.add_key(instance.__table__, str(instance.id))
 
         for relationship in inspector.mapper.relationships:
             if relationship.uselist:
@@ -76,28 +122,14 @@ class SQLAlchemyFlattener:
                             relationship, instance, child
                         )
                         # check that the secondary row is not already present - ID values could be random
-                        if not (
-                            secondary_records := data_map.get(relationship.secondary)
-                        ) or not any(
-                            {
-                                k: v
-                                for k, v in secondary_dict.items()
-                                if k != self.id_attribute_name
-                            }
-                            == {
-                                k: v
-                                for k, v in record.items()
-                                if k != self.id_attribute_name
-                            }
-                            for record in secondary_records
+                        if not self._has_secondary_row(
+                            data_map, relationship.secondary, secondary_dict
                         ):
                             self._append_mapping(
                                 data_map, relationship.secondary, secondary_dict
                             )
                     # avoid infinite recursion when circular references are present
-                    if (entries := data_map.get(child.__table__)) and any(
-                        str(entry.get("id")) == str(child.id) for entry in entries
-                    ):
+                    if self._has_instance(data_map, child):
                         continue
                     # recursive flattening
                     data_map = self.flatten_instance(child, data_map)
@@ -105,14 +137,188 @@ class SQLAlchemyFlattener:
             else:
                 if (child := getattr(instance, relationship.key)) is not None:
                     # avoid infinite recursion when circular references are present
-                    if (entries := data_map.get(child.__table__)) and any(
-                        str(entry.get("id")) == str(child.id) for entry in entries
-                    ):
+                    if self._has_instance(data_map, child):
                         continue
                     data_map = self.flatten_instance(child, data_map)
 
         return data_map
 
+    def _has_instance(
+        self,
+        data_map: dict[Table, list[dict[str, Any]]] | SpillStore,
+        instance: DeclarativeBase,
+    ) -> bool:
+        """Check whether an instance has already been flattened into the data map."""
+
+        if isinstance(data_map, SpillStore):
+            return data_map.has_key(instance.__table__, str(instance.id))
+        return bool(entries := data_map.get(instance.__table__)) and any(
+            str(entry.get("id")) == str(instance.id) for entry in entries
+        )
+
+    def _has_secondary_row(
+        self,
+        data_map: dict[Table, list[dict[str, Any]]] | SpillStore,
+        table: Table,
+        secondary_dict: dict[str, Any],
+    ) -> bool:
+        """Check whether an association row is already present, ignoring its ID."""
+
+        values = {
+            k: v for k, v in secondary_dict.items() if k != self.id_attribute_name
+        }
+        if isinstance(data_map, SpillStore):
+            key = tuple(sorted(values.items()))
+            if data_map.has_key(table, key):
+                return True
+            data_map.add_key(table, key)
+            return False
+        return bool(records := data_map.get(table)) and any(
+            values == {k: v for k, v in record.items() if k != self.id_attribute_name}
+            for record in records
+        )
+
+    def flatten_query(
+        self,
+        connection: Connection,
+        statements: Select[Any] | Sequence[Select[Any]],
+        batch_size: int = 500,
+        max_rows: int | None = None,
+        yield_per: int = 1000,
+    ) -> dict[Table, list[dict[str, Any]]]:
+        """Flatten rows selected from a live database, along with every row they reference.
+
+        Each root statement must select from a single table. Rows referenced through foreign
+        keys are fetched in batched `IN` queries until the extract is self-contained, without
+        building any ORM instances. The returned mapping is in foreign key dependency order.
+
+        Results are streamed from the database, but the converted rows are collected in
+        memory before they are returned, so `max_rows` should bound the extract size.
+
+        Args:
+            connection: The connection to read rows from.
+            statements: The root `select()` statement(s).
+            batch_size: The maximum number of keys per `IN` query.
+            max_rows: The maximum number of rows to extract, or `None` for no limit.
+            yield_per: The number of rows to buffer per fetch from a server-side cursor.
+        """
+
+        if not isinstance(statements, Sequence):
+            statements = [statements]
+
+        data_map: dict[Table, list[dict[str, Any]]] = {}
+        seen: dict[Table, set[tuple[Any, ...]]] = {}
+        pending: dict[tuple[Table, tuple[Column[Any], ...]], set[tuple[Any, ...]]] = {}
+        row_count = 0
+
+        for statement in statements:
+            froms = statement.get_final_froms()
+            if len(froms) != 1 or not isinstance(froms[0], Table):
+                raise ValueError("Root statements must select from a single table.")
+            row_count += self._fetch_rows(
+                connection,
+                froms[0],
+                statement,
+                data_map,
+                seen,
+                pending,
+                None if max_rows is None else max_rows - row_count,
+                yield_per,
+            )
+
+        while pending:
+            (table, columns), keys = pending.popitem()
+            if tuple(table.primary_key.columns) == columns:
+                keys = keys - seen.get(table, set())
+            key_list = sorted(keys, key=str)
+            for index in range(0, len(key_list), batch_size):
+                batch = key_list[index : index + batch_size]
+                if len(columns) == 1:
+                    criteria = columns[0].in_([key[0] for key in batch])
+                else:
+                    criteria = tuple_(*columns).in_(batch)
+                row_count += self._fetch_rows(
+                    connection,
+                    table,
+                    select(table).where(criteria),
+                    data_map,
+                    seen,
+                    pending,
+                    None if max_rows is None else max_rows - row_count,
+                    yield_per,
+                )
+
+        # referenced tables are fetched last, but must be inserted first
+        return {table: data_map[table] for table in sort_tables(data_map)}
+
+    def _fetch_rows(
+        self,
+        connection: Connection,
+        table: Table,
+        statement: Select[Any],
+        data_map: dict[Table, list[dict[str, Any]]],
+        seen: dict[Table, set[tuple[Any, ...]]],
+        pending: dict[tuple[Table, tuple[Column[Any], ...]], set[tuple[Any, ...]]],
+        budget: int | None,
+        yield_per: int,
+    ) -> int:
+        """Append newly selected rows to the data map and queue the rows they reference."""
+
+        columns = list(table.columns)
+        positions = {column: index for index, column in enumerate(columns)}
+        key_positions = [positions[column] for column in table.primary_key.columns]
+        foreign_keys = [
+            (
+                (fk.referred_table, tuple(element.column for element in fk.elements)),
+                [positions[element.parent] for element in fk.elements],
+            )
+            for fk in table.foreign_key_constraints
+        ]
+        keys = [column.key for column in columns]
+        serializers = [self.serializers.resolve(column.type) for column in columns]
+        seen_keys = seen.setdefault(table, set())
+        added = 0
+
+        # stream results from a server-side cursor where the driver supports it, set per
+        # statement so the caller's connection options are left untouched
+        result = connection.execute(
+            statement.with_only_columns(*columns),
+            execution_options={"yield_per": yield_per},
+        )
+        for partition in result.partitions():
+            rows = []
+            for row in partition:
+                identity = (
+                    tuple(row[i] for i in key_positions)
+                    if key_positions
+                    else tuple(row)
+                )
+                if identity in seen_keys:
+                    continue
+                added += 1
+                if budget is not None and added > budget:
+                    result.close()
+                    raise ValueError(
+                        "Row budget exceeded while flattening query results."
+                    )
+                seen_keys.add(identity)
+                rows.append(row)
+                for target, fk_positions in foreign_keys:
+                    reference = tuple(row[i] for i in fk_positions)
+                    if any(value is None for value in reference):
+                        continue
+                    pending.setdefault(target, set()).add(reference)
+
+            # convert each column of the partition in a single batched call
+            converted = [
+                serializer.batch([row[index] for row in rows])
+                for index, serializer in enumerate(serializers)
+            ]
+            for values in zip(*converted):
+                self._append_mapping(data_map, table, dict(zip(keys, values)))
+
+        return added
+
     def generate_secondary_row(
         self,
         relationship: Relationship,
@@ -120,25 +326,57 @@ class SQLAlchemyFlattener:
         child: DeclarativeBase,
     ) -> dict[str, Any]:
         """Generate rows for secondary a.k.a. association tables."""
-        secondary_dict = {}
-        for column in relationship.remote_side:
-            foreign_key = next(iter(column.foreign_keys))
-            secondary_dict[column.name] = (
-                getattr(parent, foreign_key.column.name)
-                if foreign_key.column.table == parent.__table__
-                else getattr(child, foreign_key.column.name)
+        return {
+            name: serializer(getattr(parent if from_parent else child, attribute))
+            for name, from_parent, attribute, serializer in self._secondary_columns(
+                relationship
             )
-            if self.serialize_uuids and isinstance(secondary_dict[column.name], UUID):
-                secondary_dict[column.name] = str(secondary_dict[column.name])
+        }
 
-        return secondary_dict
+    def _secondary_columns(
+        self, relationship: Relationship
+    ) -> list[tuple[str, bool, str, ColumnSerializer]]:
+        """Map each secondary column to the parent or child attribute it is populated from.
+
+        The mapping is derived from the relationship's synchronize pairs, so self-referential
+        secondaries resolve each column to the correct side, and is cached per relationship.
+        """
+        if (columns := self._secondary_column_map.get(relationship)) is None:
+            sources = {
+                secondary_column: (True, relationship.parent, local_column)
+                for local_column, secondary_column in relationship.synchronize_pairs
+            }
+            sources.update(
+                (secondary_column, (False, relationship.mapper, remote_column))
+                for remote_column, secondary_column in (
+                    relationship.secondary_synchronize_pairs or []
+                )
+            )
+            columns = []
+            for column in relationship.secondary.columns:
+                if column not in sources:
+                    continue
+                from_parent, mapper, source_column = sources[column]
+                columns.append(
+                    (
+                        column.name,
+                        from_parent,
+                        mapper.get_property_by_column(source_column).key,
+                        self.serializers.resolve(column.type),
+                    )
+                )
+            self._secondary_column_map[relationship] = columns
+        return columns
 
     def _append_mapping(
         self,
-        data_map: dict[Table, list[dict[str, Any]]],
+        data_map: dict[Table, list[dict[str, Any]]] | SpillStore,
         table: Table,
         data_row: dict[str, Any],
     ) -> Any:
+        if isinstance(data_map, SpillStore):
+            data_map.append(table, data_row)
+            return data_map
         if table not in data_map:
             data_map[table] = []
         data_map[table].append(data_row)
@@ -147,27 +385,38 @@ class SQLAlchemyFlattener:
     def convert(self, instance: DeclarativeBase) -> dict[str, Any]:
         """Convert a SQLAlchemy model instance data to key value pairs as a dictionary."""
 
-        inspector = inspect(instance)
+        mapper = inspect(instance).mapper
+        if (column_serializers := self._column_serializers.get(mapper)) is None:
+            column_serializers = self._column_serializers[mapper] = [
+                (
+                    column.key,
+                    column.expression.key,
+                    self.serializers.resolve(column.expression.type),
+                )
+                for column in mapper.column_attrs
+                # skip column properties etc.
+                if not isinstance(column, MappedSQLExpression)
+            ]
+
+        return {
+            key: serializer(getattr(instance, attribute))
+            for attribute, key, serializer in column_serializers
+        }
+
+    def _convert(self, instance: DeclarativeBase) -> dict[str, Any]:
+        if not self.memoize:
+            return self.convert(instance)
+        key = id(instance)
+        if key not in self._conversions:
+            self._conversions[key] = (instance, self.convert(instance))
+        # copied, so rows are never shared between the returned data maps
+        return dict(self._conversions[key][1])
+
+    def clear_conversions(self) -> None:
+        """Release the instances and rows cached by a memoizing flattener."""
+
+        self._conversions.clear()
 
-        mapping: dict[str, str | Enum | date | UUID] = {}
-        for column in inspector.mapper.column_attrs:
-            # skip column properties etc.
-            if isinstance(column, MappedSQLExpression):
-                continue
-            value = getattr(instance, column.key)
-            if self.use_enum_values and isinstance(value, Enum):
-                value = value.value
-            elif self.serialize_dates and isinstance(value, date):
-                value = str(value)
-            elif self.serialize_uuids and isinstance(value, UUID):
-                value = str(value)
-            elif (
-                value is not None
-                and type(column.expression.type) is ARRAY
-                and type(column.expression.type.item_type) is SQLEnum
-            ):
-                value = [v.value for v in value]
-
-            mapping[column.expression.key] = value
-
-        return mapping
+    def convert_value(self, value: Any, column_type: TypeEngine[Any]) -> Any:
+        """Convert a single column value with the serializer registered for its type."""
+        return self.serializers.resolve(column_type)(value)
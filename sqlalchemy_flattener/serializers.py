@@ -0,0 +1,199 @@
+"""This module contains the registry of serializers used to convert column values."""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Callable
+from datetime import date, timedelta
+from decimal import Decimal
+from enum import Enum
+from typing import TYPE_CHECKING, Any
+from uuid import UUID
+
+from sqlalchemy.types import ARRAY, JSON, TypeDecorator, TypeEngine, Uuid
+from sqlalchemy.types import Enum as SQLEnum
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+__all__ = ["ColumnSerializer", "SerializerRegistry", "default_registry"]
+
+Serializer = Callable[[Any], Any]
+BatchSerializer = Callable[[list[Any]], list[Any]]
+
+
+class ColumnSerializer:
+    """Converts the values of a single column, resolved once per column type."""
+
+    def __init__(
+        self,
+        serializer: Serializer | None = None,
+        batch_serializer: BatchSerializer | None = None,
+    ) -> None:
+        """Initialize a column serializer.
+
+        Args:
+            serializer: Converts a single non-null value.
+            batch_serializer: Converts a list of non-null values in one call.
+        """
+        self.serializer = serializer
+        self.batch_serializer = batch_serializer
+
+    def __call__(self, value: Any) -> Any:
+        if value is None or self.serializer is None:
+            return value
+        return self.serializer(value)
+
+    def batch(self, values: Sequence[Any]) -> list[Any]:
+        """Convert a whole column of values, passing nulls through unchanged."""
+
+        if self.serializer is None:
+            return list(values)
+        if self.batch_serializer is None:
+            return [None if v is None else self.serializer(v) for v in values]
+        indexes = [i for i, v in enumerate(values) if v is not None]
+        converted = list(values)
+        for index, value in zip(
+            indexes, self.batch_serializer([values[i] for i in indexes])
+        ):
+            converted[index] = value
+        return converted
+
+
+class SerializerRegistry:
+    """Serializers keyed by SQLAlchemy type class or Python value type.
+
+    A column is resolved once: serializers registered for its SQLAlchemy type (or the type a
+    `TypeDecorator` wraps) take precedence, `ARRAY` columns serialize their items with the
+    item type's serializer, and anything else is dispatched on the Python type of each value.
+    """
+
+    def __init__(self) -> None:
+        self._column_types: dict[type, tuple[Serializer, BatchSerializer | None]] = {}
+        self._value_types: dict[type, tuple[Serializer, BatchSerializer | None]] = {}
+        self._resolved: dict[TypeEngine[Any], ColumnSerializer] = {}
+        self._dispatch: dict[
+            type, tuple[Serializer, BatchSerializer | None] | None
+        ] = {}
+
+    def register(
+        self,
+        key: type,
+        serializer: Serializer,
+        batch_serializer: BatchSerializer | None = None,
+    ) -> None:
+        """Register a serializer for a SQLAlchemy type class or a Python value type.
+
+        Args:
+            key: A `TypeEngine` subclass, or any other Python type.
+            serializer: Converts a single non-null value.
+            batch_serializer: Optionally converts a list of non-null values in one call.
+        """
+        if issubclass(key, TypeEngine):
+            self._column_types[key] = (serializer, batch_serializer)
+        else:
+            self._value_types[key] = (serializer, batch_serializer)
+        self._resolved.clear()
+        self._dispatch.clear()
+
+    def resolve(self, column_type: TypeEngine[Any]) -> ColumnSerializer:
+        """Return the serializer for a column type."""
+
+        if (resolved := self._resolved.get(column_type)) is None:
+            resolved = self._resolved[column_type] = self._resolve(column_type)
+        return resolved
+
+    def _resolve(self, column_type: TypeEngine[Any]) -> ColumnSerializer:
+        types = [column_type]
+        if isinstance(column_type, TypeDecorator):
+            types.append(column_type.impl_instance)
+        for type_ in types:
+            for cls in type(type_).__mro__:
+                if cls in self._column_types:
+                    return ColumnSerializer(*self._column_types[cls])
+            if isinstance(type_, ARRAY):
+                if isinstance(type_.item_type, SQLEnum):
+                    # enum arrays always hold enum values, whatever `use_enum_values` is
+                    return ColumnSerializer(enum_values)
+                return ColumnSerializer(self.resolve(type_.item_type).batch)
+        return ColumnSerializer(self._serialize_value, self._serialize_values)
+
+    def _lookup(
+        self, value_type: type
+    ) -> tuple[Serializer, BatchSerializer | None] | None:
+        if value_type not in self._dispatch:
+            self._dispatch[value_type] = next(
+                (
+                    self._value_types[cls]
+                    for cls in value_type.__mro__
+                    if cls in self._value_types
+                ),
+                None,
+            )
+        return self._dispatch[value_type]
+
+    def _serialize_value(self, value: Any) -> Any:
+        serializers = self._lookup(type(value))
+        return value if serializers is None else serializers[0](value)
+
+    def _serialize_values(self, values: list[Any]) -> list[Any]:
+        # a column holding a single value type can use that type's batch serializer
+        value_types = {type(value) for value in values}
+        if len(value_types) == 1:
+            serializers = self._lookup(value_types.pop())
+            if serializers is None:
+                return values
+            if serializers[1] is not None:
+                return serializers[1](values)
+        return [self._serialize_value(value) for value in values]
+
+
+def serialize_interval(value: timedelta) -> str:
+    """Render a `timedelta` as a PostgreSQL interval literal."""
+    return (
+        f"{value.days} days {value.seconds} seconds {value.microseconds} microseconds"
+    )
+
+
+def enum_values(values: list[Any]) -> list[Any]:
+    """Replace the enum members in an array with their values."""
+    return [value.value if isinstance(value, Enum) else value for value in values]
+
+
+def default_registry(
+    serialize_uuids: bool = True,
+    serialize_dates: bool = True,
+    use_enum_values: bool = True,
+    serialize_decimals: bool = False,
+    serialize_json: bool = False,
+    serialize_intervals: bool = False,
+) -> SerializerRegistry:
+    """Build the registry used by default by `SQLAlchemyFlattener`.
+
+    Args:
+        serialize_uuids: Whether to serialize UUIDs to strings.
+        serialize_dates: Whether to serialize dates to strings.
+        use_enum_values: Whether to use enum values instead of enum names.
+        serialize_decimals: Whether to serialize decimals to strings.
+        serialize_json: Whether to serialize `JSON` columns to JSON strings. Leave this off
+            for bulk inserts and `write_as_sql`, which both encode `JSON` columns themselves.
+        serialize_intervals: Whether to serialize `timedelta` values to PostgreSQL interval
+            literals.
+    """
+    registry = SerializerRegistry()
+    if use_enum_values:
+        registry.register(Enum, lambda value: value.value)
+    if serialize_dates:
+        registry.register(date, str)
+    if serialize_uuids:
+        registry.register(UUID, str, lambda values: list(map(str, values)))
+        registry.register(Uuid, str, lambda values: list(map(str, values)))
+    if serialize_decimals:
+        registry.register(Decimal, str)
+    if serialize_json:
+        registry.register(
+            JSON, json.dumps, lambda values: [json.dumps(v) for v in values]
+        )
+    if serialize_intervals:
+        registry.register(timedelta, serialize_interval)
+    return registry
@@ -0,0 +1,168 @@
+"""This module contains a disk-backed store for flattened data too large to hold in memory."""
+
+from __future__ import annotations
+
+import hashlib
+import pickle
+import shutil
+import sqlite3
+import tempfile
+import weakref
+from collections.abc import Hashable, Iterable, Iterator, Mapping
+from itertools import groupby
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy.schema import sort_tables
+
+if TYPE_CHECKING:
+    from types import TracebackType
+
+    from sqlalchemy import Table
+    from typing_extensions import Self
+
+__all__ = ["SpillStore"]
+
+
+class SpillStore(Mapping["Table", "SpilledRows"]):
+    """A mapping of tables to rows that spills row buffers to temporary files.
+
+    Rows are buffered in memory until `threshold` rows are held in total, at which point
+    every buffer is appended to its table's segment file as pickled tuples. Iterating a
+    table's rows reads its segments back in insertion order, followed by any rows still
+    buffered, and iterating the store yields tables in foreign key dependency order.
+
+    Row identities used for deduplication are kept as 16 byte digests in a SQLite index
+    next to the segments, so only SQLite's bounded page cache is held in memory.
+    """
+
+    def __init__(self, threshold: int, directory: str | None = None) -> None:
+        """Initialize a spill store.
+
+        Args:
+            threshold: The number of rows to buffer in memory before spilling to disk.
+            directory: The directory to create temporary segment files in.
+        """
+        self.threshold = threshold
+        self.path = Path(tempfile.mkdtemp(prefix="sqlflat-", dir=directory))
+        # the store may be closed by a different thread than the one that filled it
+        self._index = sqlite3.connect(self.path / "keys.db", check_same_thread=False)
+        self._index.execute("PRAGMA journal_mode = OFF")
+        self._index.execute("PRAGMA synchronous = OFF")
+        self._index.execute("CREATE TABLE keys (digest BLOB PRIMARY KEY) WITHOUT ROWID")
+        self._finalizer = weakref.finalize(self, _remove, self._index, self.path)
+        self._tables: dict[Table, int] = {}
+        self._buffers: dict[Table, list[dict[str, Any]]] = {}
+        self._buffered = 0
+
+    def __getitem__(self, table: Table) -> SpilledRows:
+        if table not in self._tables:
+            raise KeyError(table)
+        return SpilledRows(self, table)
+
+    def __iter__(self) -> Iterator[Table]:
+        return iter(sort_tables(self._tables))
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def append(self, table: Table, row: dict[str, Any]) -> None:
+        """Append a row to a table, spilling all buffers once the threshold is reached."""
+
+        self._tables[table] = self._tables.get(table, 0) + 1
+        self._buffers.setdefault(table, []).append(row)
+        self._buffered += 1
+        if self._buffered >= self.threshold:
+            self.spill()
+
+    def spill(self) -> None:
+        """Append every buffered row to its table's segment file."""
+
+        for table, rows in self._buffers.items():
+            with self._segment_path(table).open("ab") as file:
+                for keys, group in groupby(rows, key=tuple):
+                    pickle.dump(
+                        (keys, [tuple(row.values()) for row in group]),
+                        file,
+                        protocol=pickle.HIGHEST_PROTOCOL,
+                    )
+        self._buffers.clear()
+        self._buffered = 0
+
+    def add_key(self, table: Table, key: Hashable) -> None:
+        """Record a row identity for `table`, so it can be deduplicated later."""
+        self._index.execute(
+            "INSERT OR IGNORE INTO keys VALUES (?)", (self._hash_key(table, key),)
+        )
+
+    def has_key(self, table: Table, key: Hashable) -> bool:
+        """Check whether a row identity has been recorded for `table`."""
+        cursor = self._index.execute(
+            "SELECT 1 FROM keys WHERE digest = ?", (self._hash_key(table, key),)
+        )
+        return cursor.fetchone() is not None
+
+    def count(self, table: Table) -> int:
+        """Return the number of rows appended to a table."""
+        return self._tables.get(table, 0)
+
+    def close(self) -> None:
+        """Discard buffered rows and remove the segment files."""
+
+        self._tables.clear()
+        self._buffers.clear()
+        self._finalizer()
+
+    def iter_rows(self, table: Table) -> Iterator[dict[str, Any]]:
+        """Yield the rows of a table, reading spilled segments before buffered rows."""
+
+        path = self._segment_path(table)
+        if path.exists():
+            with path.open("rb") as file:
+                while True:
+                    try:
+                        keys, values = pickle.load(file)
+                    except EOFError:
+                        break
+                    for value in values:
+                        yield dict(zip(keys, value))
+        yield from self._buffers.get(table, [])
+
+    def _segment_path(self, table: Table) -> Path:
+        return self.path / f"{id(table)}.segment"
+
+    def _hash_key(self, table: Table, key: Hashable) -> bytes:
+        # 128 bit digests keep the index compact while making collisions negligible
+        return hashlib.blake2b(
+            repr((table.fullname, key)).encode(), digest_size=16
+        ).digest()
+
+
+class SpilledRows(Iterable[dict[str, Any]]):
+    """A re-iterable view over the rows of a single table in a `SpillStore`."""
+
+    def __init__(self, store: SpillStore, table: Table) -> None:
+        self.store = store
+        self.table = table
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        return self.store.iter_rows(self.table)
+
+    def __len__(self) -> int:
+        return self.store.count(self.table)
+
+
+def _remove(index: sqlite3.Connection, path: Path) -> None:
+    index.close()
+    shutil.rmtree(path, ignore_errors=True)
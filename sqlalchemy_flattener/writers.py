@@ -2,43 +2,203 @@
 
 from __future__ import annotations
 
-from datetime import date
-from typing import TYPE_CHECKING, Any
+import io
+import json
+from collections.abc import Iterable, Iterator, Mapping
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import IO, TYPE_CHECKING, Any, Literal
 
 if TYPE_CHECKING:
     from sqlalchemy import Table
 
+Compression = Literal["gzip", "zstd"]
 
-def write_as_dict(data: dict[Table, list[dict[str, Any]]], path: str) -> None:
-    """Write a data mapping to a file."""
 
-    with open(path, "w") as file:
-        for table, value_list in data.items():
-            file.write(f"{table.name} = {value_list}\n")
+def write_as_dict(
+    data: Mapping[Table, Iterable[dict[str, Any]]],
+    path: str,
+    deterministic: bool = False,
+    compression: Compression | None = None,
+) -> None:
+    """Write a data mapping to a file.
 
+    Args:
+        data: The flattened data mapping.
+        path: The output file path.
+        deterministic: Whether to write tables in dependency order, sort rows by primary key
+            and order columns as defined on the table.
+        compression: Optionally compress the output with `gzip` or `zstd`.
+    """
 
-def write_as_sql(data: dict[Table, list[dict[str, Any]]], path: str) -> None:
-    """Write a datamapping as raw SQL `INSERT` statements."""
+    with _open(path, compression) as file:
+        for table in _sorted_tables(data) if deterministic else data:
+            value_list = data[table]
+            if deterministic:
+                value_list = _sorted_rows(table, value_list)
+            # stream rows one at a time, matching the `repr` of a list
+            file.write(f"{table.name} = [")
+            for index, row in enumerate(value_list):
+                file.write(f", {row!r}" if index else repr(row))
+            file.write("]\n")
 
-    with open(path, "w") as file:
-        for table, data_list in data.items():
-            value_list = []
-            for data_map in data_list:
+
+def write_as_sql(
+    data: Mapping[Table, Iterable[dict[str, Any]]],
+    path: str,
+    deterministic: bool = False,
+    compression: Compression | None = None,
+) -> None:
+    """Write a datamapping as raw SQL `INSERT` statements.
+
+    Args:
+        data: The flattened data mapping.
+        path: The output file path.
+        deterministic: Whether to write tables in dependency order, sort rows by primary key
+            and order columns as defined on the table.
+        compression: Optionally compress the output with `gzip` or `zstd`.
+    """
+
+    from .serializers import serialize_interval
+
+    with _open(path, compression) as file:
+        for table in _sorted_tables(data) if deterministic else data:
+            data_list = data[table]
+            if deterministic:
+                data_list = _sorted_rows(table, data_list)
+            json_keys = _json_keys(table)
+            index = -1
+            for index, data_map in enumerate(data_list):
+                if index:
+                    file.write(",\n")
+                else:
+                    file.write(
+                        f"""\nINSERT INTO "{table.name}" ({", ".join(data_map.keys())})\nVALUES\n"""
+                    )
                 values = []
-                for item in data_map.values():
+                for key, item in data_map.items():
                     if item is None:
                         value = "NULL"
+                    elif key in json_keys:
+                        value = f"""'{json.dumps(item).replace("'", "''")}'"""
                     elif isinstance(item, str):
                         value = f"""'{item.replace("'", "''")}'"""
-                    elif isinstance(item, date | bool):
+                    elif isinstance(item, (date, bool)):
                         value = f"'{item}'"
+                    elif isinstance(item, bytes):
+                        value = f"'\\x{item.hex()}'"
+                    elif isinstance(item, timedelta):
+                        value = f"'{serialize_interval(item)}'"
                     elif isinstance(item, list):
-                        value = f"'{{{', '.join(item)}}}'"
+                        items = ("NULL" if i is None else str(i) for i in item)
+                        value = f"'{{{', '.join(items)}}}'"
                     else:
                         value = str(item)
                     values.append(value)
-                value_list.append(f"    ({', '.join(values)})")
-            value_string = ",\n".join(value_list)
-            file.write(
-                f"""\nINSERT INTO "{table.name}" ({", ".join(data_list[0].keys())})\nVALUES\n{value_string};\n"""
-            )
+                file.write(f"    ({', '.join(values)})")
+            if index >= 0:
+                file.write(";\n")
+
+
+@contextmanager
+def _open(path: str, compression: Compression | None) -> Iterator[IO[str]]:
+    """Open a text file for writing, optionally through a streaming compressor."""
+
+    if compression not in (None, "gzip", "zstd"):
+        # checked up front, so no empty output file is left behind
+        raise ValueError(f"Unsupported compression: {compression}")
+    if compression is None:
+        with open(path, "w", encoding="utf-8") as file:
+            yield file
+        return
+
+    with open(path, "wb") as raw:
+        if compression == "gzip":
+            import gzip
+
+            # an empty filename and fixed mtime keep the gzip header reproducible
+            stream = gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0)
+        else:
+            stream = _zstd_writer(raw)
+        with io.TextIOWrapper(stream, encoding="utf-8") as file:
+            yield file
+
+
+def _zstd_writer(raw: IO[bytes]) -> IO[bytes]:
+    """Wrap a binary file in a zstd compressor that leaves the file open on close."""
+
+    try:
+        from compression import zstd  # type: ignore[import-not-found]
+    except ImportError:
+        try:
+            import zstandard
+        except ImportError as exc:
+            raise ImportError(
+                "zstd compression requires Python 3.14+ or the `zstandard` package, "
+                "install it with `pip install sqlalchemy-flattener[zstd]`."
+            ) from exc
+        return zstandard.ZstdCompressor().stream_writer(raw, closefd=False)
+    return zstd.ZstdFile(raw, "wb")
+
+
+def _json_keys(table: Table) -> set[str]:
+    """Return the keys of a table's `JSON` columns, including decorated ones."""
+
+    from sqlalchemy.types import JSON, TypeDecorator
+
+    keys = set()
+    for column in table.columns:
+        column_type = column.type
+        if isinstance(column_type, TypeDecorator):
+            column_type = column_type.impl_instance
+        if isinstance(column_type, JSON):
+            keys.add(column.key)
+    return keys
+
+
+def _sorted_tables(tables: Iterable[Table]) -> list[Table]:
+    """Sort tables in foreign key dependency order, whatever order they were flattened in."""
+
+    from sqlalchemy.schema import sort_tables
+
+    # pre-sorted by name, so tables without a dependency between them keep a fixed order
+    return sort_tables(sorted(tables, key=lambda table: table.name))
+
+
+def _sorted_rows(table: Table, rows: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Sort rows by primary key and order their columns as defined on the table.
+
+    Rows are tie-broken on every column, so rows missing their primary key (such as
+    association rows without their surrogate `id`) still sort deterministically.
+    """
+
+    from .spill import SpilledRows
+
+    if isinstance(rows, SpilledRows):
+        # sorting would pull the whole spilled table back into memory
+        raise TypeError("Deterministic output is not supported for spilled rows.")
+
+    column_keys = [column.key for column in table.columns]
+    key_columns = [column.key for column in table.primary_key.columns]
+
+    def ordered(row: dict[str, Any]) -> dict[str, Any]:
+        mapping = {key: row[key] for key in column_keys if key in row}
+        mapping.update((key, value) for key, value in row.items() if key not in mapping)
+        return mapping
+
+    return sorted(
+        (ordered(row) for row in rows),
+        key=lambda row: (
+            [_sort_key(row.get(key)) for key in key_columns]
+            + [(key, _sort_key(value)) for key, value in row.items()]
+        ),
+    )
+
+
+def _sort_key(value: Any) -> tuple[bool, str, Any]:
+    # NULLs sort last, and values of differing types never get compared directly
+    if value is None:
+        return (True, "", None)
+    if isinstance(value, (dict, set)):
+        return (False, type(value).__name__, repr(value))
+    return (False, type(value).__name__, value)
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from sqlalchemy_flattener.__main__ import main
+
+
+def test_manifest(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    manifest = tmp_path / "seeds.toml"
+    manifest.write_text(
+        f"""
+deterministic = true
+
+[[outputs]]
+instances = "examples.instances.nested_supplier"
+order = "examples.models.INSERT_ORDER"
+output = "{tmp_path / "supplier.sql"}"
+
+[[outputs]]
+instances = "examples.instances.nested_supplier"
+order = "examples.models.INSERT_ORDER"
+output = "{tmp_path / "supplier.py"}"
+format = "dict"
+"""
+    )
+    monkeypatch.setattr("sys.argv", ["sqlflat", "--manifest", str(manifest)])
+    main()
+
+    monkeypatch.setattr(
+        "sys.argv",
+        [
+            "sqlflat",
+            "examples.instances.nested_supplier",
+            "examples.models.INSERT_ORDER",
+            str(tmp_path / "single.sql"),
+            "--deterministic",
+        ],
+    )
+    main()
+
+    assert (tmp_path / "supplier.sql").read_text() == (
+        tmp_path / "single.sql"
+    ).read_text()
+    assert (tmp_path / "supplier.py").read_text().startswith("address = [")
+
+
+def test_manifest_missing_keys(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    manifest = tmp_path / "seeds.toml"
+    manifest.write_text(
+        '[[outputs]]\ninstances = "examples.instances.nested_supplier"\n'
+    )
+    monkeypatch.setattr("sys.argv", ["sqlflat", "--manifest", str(manifest)])
+    with pytest.raises(ValueError, match="missing order, output"):
+        main()
+
+
+@pytest.mark.parametrize(
+    ("manifest_text", "message"),
+    [
+        ("deterministc = true\n", "unknown keys deterministc"),
+        ('compression = "bz2"\n', "unknown compression"),
+    ],
+)
+def test_manifest_invalid_options(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, manifest_text: str, message: str
+) -> None:
+    manifest = tmp_path / "seeds.toml"
+    manifest.write_text(
+        f"""{manifest_text}
+[[outputs]]
+instances = "examples.instances.nested_supplier"
+order = "examples.models.INSERT_ORDER"
+output = "{tmp_path / "supplier.sql"}"
+"""
+    )
+    monkeypatch.setattr("sys.argv", ["sqlflat", "--manifest", str(manifest)])
+    with pytest.raises(ValueError, match=message):
+        main()
+    assert not (tmp_path / "supplier.sql").exists()
+
+
+@pytest.mark.parametrize(
+    ("arguments", "message"),
+    [
+        (["--manifest", "seeds.toml", "--jobs", "0"], "at least 1"),
+        (["instances", "order", "output", "--jobs", "2"], "only be used with"),
+    ],
+)
+def test_invalid_jobs(
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+    arguments: list[str],
+    message: str,
+) -> None:
+    monkeypatch.setattr("sys.argv", ["sqlflat", *arguments])
+    with pytest.raises(SystemExit):
+        main()
+    assert message in capsys.readouterr().err
@@ -1,5 +1,11 @@
 from __future__ import annotations
 
+from uuid import UUID
+
+import pytest
+from sqlalchemy import Column, ForeignKey, Table, Uuid
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+
 from examples.models import (
     Address,
     BankDetails,
@@ -157,3 +163,55 @@ def test_dedupe_many_to_many(supplier_categories: list[Supplier]) -> None:
             },
         ]
     )
+
+
+def test_memoize_shared_instances(supplier_categories: list[Supplier]) -> None:
+    flattener = SQLAlchemyFlattener(memoize=True)
+    first = flattener.flatten(supplier_categories[0])
+    second = flattener.flatten(supplier_categories[1])
+
+    # shared categories are converted once, then copied into each data map
+    assert all(
+        any(row == other and row is not other for other in second[Category.__table__])
+        for row in first[Category.__table__]
+    )
+    assert flattener._conversions
+    flattener.clear_conversions()
+    assert not flattener._conversions
+
+    with pytest.raises(ValueError, match="spill_threshold"):
+        SQLAlchemyFlattener(memoize=True, spill_threshold=10)
+
+
+def test_self_referential_secondary() -> None:
+    class Base(DeclarativeBase):
+        pass
+
+    friendship = Table(
+        "friendship",
+        Base.metadata,
+        Column("person_id", Uuid(), ForeignKey("person.id"), primary_key=True),
+        Column("friend_id", Uuid(), ForeignKey("person.id"), primary_key=True),
+    )
+
+    class Person(Base):
+        __tablename__ = "person"
+
+        id: Mapped[UUID] = mapped_column(Uuid(), primary_key=True)
+        friends: Mapped[list[Person]] = relationship(
+            secondary=friendship,
+            primaryjoin=lambda: Person.id == friendship.c.person_id,
+            secondaryjoin=lambda: Person.id == friendship.c.friend_id,
+        )
+
+    friend = Person(id=UUID("3674c73c-a967-493f-9a4b-5b70f78a5a99"))
+    person = Person(id=UUID("f66c3eb7-7b93-4d9f-bc66-8ff07353f5e7"), friends=[friend])
+
+    data = SQLAlchemyFlattener().flatten(person)
+    assert data[friendship] == [
+        {
+            "person_id": "f66c3eb7-7b93-4d9f-bc66-8ff07353f5e7",
+            "friend_id": "3674c73c-a967-493f-9a4b-5b70f78a5a99",
+        }
+    ]
+    assert len(data[Person.__table__]) == 2
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    "module", ["sqlalchemy_flattener", "sqlalchemy_flattener.__main__"]
+)
+def test_import_is_lazy(module: str) -> None:
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys, {module}; print(sorted(m for m in sys.modules if m.startswith('sqlalchemy.')))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "[]"
+
+
+HELP_SCRIPT = """
+import sys
+from sqlalchemy_flattener.__main__ import main
+sys.argv = ['sqlflat', '--help']
+try:
+    main()
+except SystemExit:
+    print('sqlalchemy' in sys.modules)
+"""
+
+
+def test_help_does_not_import_sqlalchemy() -> None:
+    result = subprocess.run(
+        [sys.executable, "-c", HELP_SCRIPT],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.splitlines()[-1] == "False"
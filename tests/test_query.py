@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import sqlite3
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from sqlalchemy import (
+    Column,
+    Connection,
+    ForeignKey,
+    Integer,
+    MetaData,
+    Table,
+    Text,
+    create_engine,
+    insert,
+    select,
+)
+
+from sqlalchemy_flattener import SQLAlchemyFlattener
+from sqlalchemy_flattener.writers import write_as_sql
+
+metadata = MetaData()
+
+country = Table(
+    "country",
+    metadata,
+    Column("id", Integer(), primary_key=True),
+    Column("name", Text()),
+)
+city = Table(
+    "city",
+    metadata,
+    Column("id", Integer(), primary_key=True),
+    Column("name", Text()),
+    Column("country_id", Integer(), ForeignKey("country.id")),
+)
+person = Table(
+    "person",
+    metadata,
+    Column("id", Integer(), primary_key=True),
+    Column("name", Text()),
+    Column("city_id", Integer(), ForeignKey("city.id")),
+    Column("manager_id", Integer(), ForeignKey("person.id"), nullable=True),
+)
+
+
+@pytest.fixture
+def connection() -> Iterator[Connection]:
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(country),
+            [{"id": 1, "name": "Tamriel"}, {"id": 2, "name": "Akavir"}],
+        )
+        conn.execute(
+            insert(city),
+            [
+                {"id": 1, "name": "Solitude", "country_id": 1},
+                {"id": 2, "name": "Windhelm", "country_id": 1},
+                {"id": 3, "name": "Tsaesci", "country_id": 2},
+            ],
+        )
+        conn.execute(
+            insert(person),
+            [
+                {"id": 1, "name": "Elisif", "city_id": 1, "manager_id": None},
+                {"id": 2, "name": "Falk", "city_id": 1, "manager_id": 1},
+                {"id": 3, "name": "Ulfric", "city_id": 2, "manager_id": None},
+                {"id": 4, "name": "Galmar", "city_id": 2, "manager_id": 3},
+            ],
+        )
+        yield conn
+    engine.dispose()
+
+
+def test_flatten_query_follows_foreign_keys(connection: Connection) -> None:
+    flattener = SQLAlchemyFlattener()
+    data = flattener.flatten_query(
+        connection, select(person).where(person.c.id == 4), batch_size=1
+    )
+
+    assert sorted(data[person], key=lambda row: row["id"]) == [
+        {"id": 3, "name": "Ulfric", "city_id": 2, "manager_id": None},
+        {"id": 4, "name": "Galmar", "city_id": 2, "manager_id": 3},
+    ]
+    assert data[city] == [{"id": 2, "name": "Windhelm", "country_id": 1}]
+    assert data[country] == [{"id": 1, "name": "Tamriel"}]
+
+
+def test_flatten_query_keeps_connection_options(connection: Connection) -> None:
+    options = connection.get_execution_options()
+    SQLAlchemyFlattener().flatten_query(connection, select(person), yield_per=2)
+    assert connection.get_execution_options() == options
+
+
+def test_flatten_query_dedupes_across_statements(connection: Connection) -> None:
+    flattener = SQLAlchemyFlattener()
+    data = flattener.flatten_query(
+        connection,
+        [select(city.c.name).where(city.c.country_id == 1), select(country)],
+    )
+
+    assert len(data[city]) == 2
+    assert len(data[country]) == 2
+
+
+def test_flatten_query_row_budget(connection: Connection) -> None:
+    flattener = SQLAlchemyFlattener()
+    with pytest.raises(ValueError, match="Row budget"):
+        flattener.flatten_query(connection, select(person), max_rows=5)
+
+
+def test_flatten_query_insert_order(connection: Connection, tmp_path: Path) -> None:
+    data = SQLAlchemyFlattener().flatten_query(
+        connection, select(person).where(person.c.id.in_([2, 4]))
+    )
+    assert list(data) == [country, city, person]
+
+    write_as_sql(data, str(tmp_path / "seed.sql"))
+    target = sqlite3.connect(":memory:")
+    target.execute("PRAGMA foreign_keys = ON")
+    target.executescript(
+        "CREATE TABLE country (id INTEGER PRIMARY KEY, name TEXT);"
+        "CREATE TABLE city (id INTEGER PRIMARY KEY, name TEXT,"
+        " country_id INTEGER REFERENCES country (id));"
+        "CREATE TABLE person (id INTEGER PRIMARY KEY, name TEXT,"
+        " city_id INTEGER REFERENCES city (id),"
+        " manager_id INTEGER REFERENCES person (id));"
+    )
+    target.executescript((tmp_path / "seed.sql").read_text())
+    assert target.execute("SELECT count(*) FROM person").fetchone() == (4,)
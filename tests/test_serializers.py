@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+from uuid import UUID
+
+from sqlalchemy import (
+    JSON,
+    Column,
+    Integer,
+    Interval,
+    LargeBinary,
+    MetaData,
+    Numeric,
+    Table,
+    Text,
+    TypeDecorator,
+    Uuid,
+    create_engine,
+    insert,
+    select,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from examples.instances import nested_supplier
+from examples.models import AccountType, Supplier
+from sqlalchemy_flattener import SQLAlchemyFlattener
+from sqlalchemy_flattener.serializers import SerializerRegistry, default_registry
+from sqlalchemy_flattener.writers import write_as_sql
+
+
+class Money(TypeDecorator[Decimal]):
+    impl = Numeric
+    cache_ok = True
+
+
+class Slug(TypeDecorator[str]):
+    impl = Text
+    cache_ok = True
+
+
+def test_default_serializers() -> None:
+    registry = default_registry()
+
+    # decimals, JSON and intervals are left to the database driver by default
+    assert registry.resolve(Numeric())(Decimal("1.50")) == Decimal("1.50")
+    assert registry.resolve(JSON())({"a": [1, 2]}) == {"a": [1, 2]}
+    assert registry.resolve(Interval())(timedelta(days=1)) == timedelta(days=1)
+    assert registry.resolve(ARRAY(Uuid()))(
+        [UUID("3674c73c-a967-493f-9a4b-5b70f78a5a99"), None]
+    ) == ["3674c73c-a967-493f-9a4b-5b70f78a5a99", None]
+    assert registry.resolve(Text())(AccountType.CASH) == "cash"
+    assert registry.resolve(Text())(None) is None
+
+    # flags disable the matching serializers
+    registry = default_registry(serialize_uuids=False)
+    uuid = UUID("3674c73c-a967-493f-9a4b-5b70f78a5a99")
+    assert registry.resolve(Uuid())(uuid) is uuid
+
+    # and opt into the others
+    registry = default_registry(
+        serialize_decimals=True, serialize_json=True, serialize_intervals=True
+    )
+    assert registry.resolve(Money())(Decimal("2.25")) == "2.25"
+    assert registry.resolve(JSON())({"a": [1, 2]}) == '{"a": [1, 2]}'
+    assert (
+        registry.resolve(Interval())(timedelta(days=1, hours=2, microseconds=5))
+        == "1 days 7200 seconds 5 microseconds"
+    )
+
+
+def test_resolution_order() -> None:
+    registry = SerializerRegistry()
+    registry.register(str, str.upper)
+    registry.register(Slug, lambda value: value.replace(" ", "-"))
+
+    # column types take precedence over value types, including decorated types
+    assert registry.resolve(Slug())("a slug") == "a-slug"
+    assert registry.resolve(Text())("a slug") == "A SLUG"
+    # columns are only resolved once
+    assert registry.resolve(Text()) is not registry.resolve(Text())
+    column_type = Text()
+    assert registry.resolve(column_type) is registry.resolve(column_type)
+
+
+def test_batch_serializers() -> None:
+    calls: list[list[UUID]] = []
+
+    def batch(values: list[UUID]) -> list[str]:
+        calls.append(values)
+        return [value.hex for value in values]
+
+    registry = SerializerRegistry()
+    registry.register(UUID, lambda value: value.hex, batch)
+    uuids = [UUID(int=1), None, UUID(int=2)]
+
+    assert registry.resolve(Uuid()).batch(uuids) == [uuids[0].hex, None, uuids[2].hex]
+    assert calls == [[uuids[0], uuids[2]]]
+    # mixed value types fall back to per value conversion
+    assert registry.resolve(Uuid()).batch([UUID(int=3), "x"]) == [UUID(int=3).hex, "x"]
+    assert len(calls) == 1
+
+
+def test_sql_output_for_serialized_types(tmp_path: Path) -> None:
+    table = Table(
+        "ledger",
+        MetaData(),
+        Column("id", Integer(), primary_key=True),
+        Column("amount", Money()),
+        Column("meta", JSON()),
+        Column("blob", LargeBinary()),
+        Column("codes", ARRAY(Text())),
+        Column("labels", JSON()),
+        Column("label", JSON()),
+        Column("period", Interval()),
+    )
+    flattener = SQLAlchemyFlattener()
+    values = [
+        1,
+        Decimal("9.99"),
+        {"note": "it's"},
+        b"\x00\xff",
+        ["a", None],
+        [1, "b"],
+        "c",
+        timedelta(days=1, seconds=5),
+    ]
+    row = {
+        column.key: flattener.convert_value(value, column.type)
+        for column, value in zip(table.columns, values)
+    }
+    write_as_sql({table: [row]}, str(tmp_path / "ledger.sql"))
+
+    # JSON columns are rendered as JSON whatever the value type, arrays as arrays
+    assert (
+        (tmp_path / "ledger.sql")
+        .read_text()
+        .endswith(
+            """    (1, 9.99, '{"note": "it''s"}', '\\x00ff', '{a, NULL}', '[1, "b"]', '"c"',"""
+            """ '1 days 5 seconds 0 microseconds');\n"""
+        )
+    )
+
+
+def test_enum_arrays_use_values(tmp_path: Path) -> None:
+    data = SQLAlchemyFlattener(use_enum_values=False).flatten(nested_supplier)
+    assert data[Supplier.__table__][0]["tags"] == ["cheap", "reliable"]
+
+    write_as_sql(
+        {Supplier.__table__: data[Supplier.__table__]}, str(tmp_path / "s.sql")
+    )
+    assert "'{cheap, reliable}'" in (tmp_path / "s.sql").read_text()
+
+
+def test_bulk_insert() -> None:
+    table = Table(
+        "event",
+        MetaData(),
+        Column("id", Integer(), primary_key=True),
+        Column("payload", JSON()),
+        Column("period", Interval()),
+    )
+    flattener = SQLAlchemyFlattener()
+    values = [1, {"a": [1, "b"]}, timedelta(hours=2)]
+    rows = [
+        {
+            column.key: flattener.convert_value(value, column.type)
+            for column, value in zip(table.columns, values)
+        }
+    ]
+
+    engine = create_engine("sqlite://")
+    table.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(table), rows)
+        # JSON is stored once encoded, not as a JSON string
+        assert connection.execute(select(table.c.payload, table.c.period)).one() == (
+            {"a": [1, "b"]},
+            timedelta(hours=2),
+        )
+    engine.dispose()
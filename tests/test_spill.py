@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from examples.models import (
+    Address,
+    Category,
+    Supplier,
+    supplier_category_association,
+)
+from sqlalchemy_flattener import SQLAlchemyFlattener
+from sqlalchemy_flattener.spill import SpillStore
+from sqlalchemy_flattener.writers import write_as_sql
+
+
+def test_spill_matches_in_memory(suppliers: tuple[Supplier], tmp_path: Path) -> None:
+    expected = SQLAlchemyFlattener().flatten(suppliers)
+    store = SQLAlchemyFlattener(spill_threshold=3).flatten(suppliers)
+
+    assert isinstance(store, SpillStore)
+    assert list(store.path.iterdir())
+    with store:
+        assert {table: list(rows) for table, rows in store.items()} == expected
+        assert len(store[Category.__table__]) == 2
+        assert len(store[supplier_category_association]) == 4
+
+        # tables are yielded in foreign key dependency order
+        tables = list(store)
+        assert tables.index(Address.__table__) < tables.index(Supplier.__table__)
+        assert tables.index(Supplier.__table__) < tables.index(
+            supplier_category_association
+        )
+
+        write_as_sql(store, str(tmp_path / "spilled.sql"))
+        write_as_sql(
+            {table: expected[table] for table in store}, str(tmp_path / "memory.sql")
+        )
+        assert (tmp_path / "spilled.sql").read_bytes() == (
+            tmp_path / "memory.sql"
+        ).read_bytes()
+
+        # deduplication uses the on-disk index
+        assert store.has_key(Category.__table__, str(suppliers[0].categories[0].id))
+        assert not store.has_key(Category.__table__, "missing")
+
+        with pytest.raises(TypeError, match="spilled rows"):
+            write_as_sql(store, str(tmp_path / "sorted.sql"), deterministic=True)
+
+    assert not store.path.exists()
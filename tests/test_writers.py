@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import ast
+import gzip
+from pathlib import Path
+from typing import Any
+from uuid import UUID
+
+import pytest
+from sqlalchemy import Column, ForeignKey, Integer, Table, Uuid
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+
+from examples.models import (
+    Address,
+    Category,
+    Supplier,
+    supplier_category_association,
+)
+from sqlalchemy_flattener import SQLAlchemyFlattener
+from sqlalchemy_flattener.writers import write_as_dict, write_as_sql
+
+
+def _read_dict_output(path: Path) -> dict[str, Any]:
+    return {
+        name: ast.literal_eval(value)
+        for name, value in (
+            line.split(" = ", 1) for line in path.read_text().splitlines()
+        )
+    }
+
+
+def test_deterministic_output(suppliers: tuple[Supplier], tmp_path: Path) -> None:
+    flattener = SQLAlchemyFlattener()
+    forward = flattener.flatten(suppliers)
+    backward = {
+        table: [dict(reversed(row.items())) for row in reversed(rows)]
+        for table, rows in flattener.flatten(suppliers[::-1]).items()
+    }
+
+    for writer in (write_as_dict, write_as_sql):
+        writer(forward, str(tmp_path / "forward"), deterministic=True)
+        writer(backward, str(tmp_path / "backward"), deterministic=True)
+        assert (tmp_path / "forward").read_bytes() == (
+            tmp_path / "backward"
+        ).read_bytes()
+
+    # tables are written in dependency order, whichever root is flattened first
+    categories_first = flattener.flatten([*suppliers[0].categories, *suppliers])
+    assert next(iter(categories_first)) is Category.__table__
+    for writer in (write_as_dict, write_as_sql):
+        writer(forward, str(tmp_path / "forward"), deterministic=True)
+        writer(categories_first, str(tmp_path / "categories"), deterministic=True)
+        assert (tmp_path / "forward").read_bytes() == (
+            tmp_path / "categories"
+        ).read_bytes()
+
+    write_as_dict(forward, str(tmp_path / "sorted.py"), deterministic=True)
+    namespace = _read_dict_output(tmp_path / "sorted.py")
+    assert [row["id"] for row in namespace[Address.__tablename__]] == sorted(
+        row["id"] for row in forward[Address.__table__]
+    )
+    assert list(namespace[supplier_category_association.name][0]) == [
+        "supplier_id",
+        "category_id",
+    ]
+
+
+def test_gzip_output(suppliers: tuple[Supplier], tmp_path: Path) -> None:
+    data = SQLAlchemyFlattener().flatten(suppliers)
+    write_as_sql(data, str(tmp_path / "plain.sql"), deterministic=True)
+    write_as_sql(
+        data, str(tmp_path / "first.sql.gz"), deterministic=True, compression="gzip"
+    )
+    write_as_sql(
+        data, str(tmp_path / "second.sql.gz"), deterministic=True, compression="gzip"
+    )
+
+    compressed = (tmp_path / "first.sql.gz").read_bytes()
+    assert compressed == (tmp_path / "second.sql.gz").read_bytes()
+    assert gzip.decompress(compressed) == (tmp_path / "plain.sql").read_bytes()
+
+
+def test_deterministic_output_without_primary_key_values(tmp_path: Path) -> None:
+    class Base(DeclarativeBase):
+        pass
+
+    a_b = Table(
+        "a_b",
+        Base.metadata,
+        Column("id", Integer(), primary_key=True),
+        Column("a_id", Uuid(), ForeignKey("a.id")),
+        Column("b_id", Uuid(), ForeignKey("b.id")),
+    )
+
+    class B(Base):
+        __tablename__ = "b"
+
+        id: Mapped[UUID] = mapped_column(Uuid(), primary_key=True)
+
+    class A(Base):
+        __tablename__ = "a"
+
+        id: Mapped[UUID] = mapped_column(Uuid(), primary_key=True)
+        bs: Mapped[list[B]] = relationship(secondary=a_b)
+
+    bs = [B(id=UUID(int=i)) for i in range(1, 4)]
+    flattener = SQLAlchemyFlattener()
+    forward = flattener.flatten(A(id=UUID(int=10), bs=bs))
+    backward = flattener.flatten(A(id=UUID(int=10), bs=bs[::-1]))
+    # association rows never carry their surrogate id
+    assert "id" not in forward[a_b][0]
+
+    write_as_sql(forward, str(tmp_path / "forward.sql"), deterministic=True)
+    write_as_sql(backward, str(tmp_path / "backward.sql"), deterministic=True)
+    assert (tmp_path / "forward.sql").read_bytes() == (
+        tmp_path / "backward.sql"
+    ).read_bytes()
+
+
+def test_zstd_output(suppliers: tuple[Supplier], tmp_path: Path) -> None:
+    try:
+        from compression import zstd  # type: ignore[import-not-found]
+
+        decompress = zstd.decompress
+    except ImportError:
+        zstandard = pytest.importorskip("zstandard")
+        decompress = zstandard.ZstdDecompressor().decompressobj().decompress
+
+    data = SQLAlchemyFlattener().flatten(suppliers)
+    write_as_sql(data, str(tmp_path / "plain.sql"), deterministic=True)
+    write_as_sql(
+        data, str(tmp_path / "seed.sql.zst"), deterministic=True, compression="zstd"
+    )
+
+    assert (
+        decompress((tmp_path / "seed.sql.zst").read_bytes())
+        == (tmp_path / "plain.sql").read_bytes()
+    )
+
+
+def test_unknown_compression(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="Unsupported compression"):
+        write_as_sql({}, str(tmp_path / "seed.sql.bz2"), compression="bz2")  # type: ignore[arg-type]
+    assert not (tmp_path / "seed.sql.bz2").exists()